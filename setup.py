@@ -94,7 +94,8 @@ setup(name="thriftpy2",
       python_requires='>=3.6',
       extras_require={
           "dev": dev_requires,
-          "tornado": tornado_requires
+          "tornado": tornado_requires,
+          "uvloop": ["uvloop"],
       },
       cmdclass=cmdclass,
       ext_modules=ext_modules,
@@ -0,0 +1,817 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import errno
+import os
+import socket
+import struct
+import tracemalloc
+from unittest import mock
+
+import pytest
+
+from thriftpy2.contrib.aio import socket as aio_socket
+from thriftpy2.contrib.aio import use_uvloop
+from thriftpy2.contrib.aio.socket import (TAsyncServerSocket, TAsyncSocket,
+                                          TAsyncSocketPool)
+from thriftpy2.contrib.aio.transport.framed import TAsyncFramedTransport
+from thriftpy2.transport import TTransportException
+
+
+async def _serve(server_socket, handler=None):
+    """Start an echo server on `server_socket` and collect the accepted
+    StreamHandler objects."""
+    conns = []
+
+    async def echo(conn):
+        conns.append(conn)
+        if handler is not None:
+            await handler(conn)
+            return
+        buff = await conn.read(1024)
+        conn.write(buff)
+        await conn.flush()
+
+    server_socket.listen()
+    server = await server_socket.accept(echo)
+    return server, conns
+
+
+def _port(server_socket):
+    return server_socket.raw_sock.getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_inet_socket():
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port)
+    await client_socket.open()
+
+    buff = b"Hello World!"
+    client_socket.write(buff)
+    await client_socket.flush()
+    assert await client_socket.read(1024) == buff
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("nodelay", [True, False])
+async def test_nodelay(nodelay):
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0,
+                                       nodelay=nodelay)
+    server, conns = await _serve(server_socket)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 nodelay=nodelay)
+    await client_socket.open()
+    client_socket.write(b"ping")
+    await client_socket.flush()
+    await client_socket.read(1024)
+
+    client_sock = client_socket.writer.get_extra_info("socket")
+    conn_sock = conns[0].writer.get_extra_info("socket")
+    for sock in (client_sock, conn_sock):
+        assert bool(sock.getsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY)) is nodelay
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_buffer_sizes():
+    size = 64 * 1024
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0,
+                                       send_buffer_size=size,
+                                       recv_buffer_size=size)
+    server, conns = await _serve(server_socket)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 send_buffer_size=size,
+                                 recv_buffer_size=size)
+    await client_socket.open()
+    client_socket.write(b"ping")
+    await client_socket.flush()
+    await client_socket.read(1024)
+
+    client_sock = client_socket.writer.get_extra_info("socket")
+    conn_sock = conns[0].writer.get_extra_info("socket")
+    for sock in (client_sock, conn_sock):
+        # linux doubles the requested value for bookkeeping overhead.
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF) >= size
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) >= size
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+def test_buffer_sizes_default():
+    """Buffer sizes are left to the kernel's autotuning by default."""
+    client_socket = TAsyncSocket(host="127.0.0.1", port=1234)
+    client_socket._init_sock()
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server_socket._init_sock()
+
+    fresh = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    for sock in (client_socket.raw_sock, server_socket.raw_sock):
+        for opt in (socket.SO_SNDBUF, socket.SO_RCVBUF):
+            assert sock.getsockopt(socket.SOL_SOCKET, opt) == \
+                fresh.getsockopt(socket.SOL_SOCKET, opt)
+        sock.close()
+    fresh.close()
+
+
+def test_ssl_context_cache():
+    kwargs = {
+        "cafile": "ssl/CA.pem",
+        "certfile": "ssl/client.crt",
+        "keyfile": "ssl/client.key",
+    }
+    s1 = TAsyncSocket(host="localhost", port=1234, **kwargs)
+    s2 = TAsyncSocket(host="localhost", port=4321, **kwargs)
+    s3 = TAsyncSocket(host="localhost", port=1234, validate=False, **kwargs)
+    assert s1.ssl_context is s2.ssl_context
+    assert s1.ssl_context is not s3.ssl_context
+
+    server1 = TAsyncServerSocket(host="localhost", port=1234,
+                                 certfile="ssl/server.pem",
+                                 keyfile="ssl/server.key")
+    server2 = TAsyncServerSocket(host="localhost", port=4321,
+                                 certfile="ssl/server.pem",
+                                 keyfile="ssl/server.key")
+    assert server1.ssl_context is server2.ssl_context
+
+
+@pytest.mark.asyncio
+async def test_readexactly():
+
+    async def handler(conn):
+        # deliver the payload in several short writes
+        for chunk in (b"Hello", b" ", b"World!"):
+            conn.write(chunk)
+            await conn.flush()
+        conn.close()
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port)
+    await client_socket.open()
+
+    assert await client_socket.readexactly(12) == b"Hello World!"
+    with pytest.raises(TTransportException) as e:
+        await client_socket.readexactly(1)
+    assert e.value.type == TTransportException.END_OF_FILE
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_write_vectored():
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port)
+    await client_socket.open()
+
+    client_socket.write_vectored([b"Hello", b" ", b"World!"])
+    await client_socket.flush()
+    assert await client_socket.readexactly(12) == b"Hello World!"
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_raw_recv", [False, True])
+async def test_graceful_close(use_raw_recv):
+    received = asyncio.get_event_loop().create_future()
+
+    async def handler(conn):
+        received.set_result(await conn.readexactly(12))
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 use_raw_recv=use_raw_recv)
+    await client_socket.open()
+    client_sock = client_socket.writer.get_extra_info("socket")
+    assert client_sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_LINGER, 8) == struct.pack("ii", 0, 0)
+
+    # data written right before close is still delivered
+    client_socket.write(b"Hello World!")
+    client_socket.close()
+    await client_socket.wait_closed()
+    assert not client_socket.is_open()
+    assert await received == b"Hello World!"
+
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_abortive_close():
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 abortive_close=True)
+    await client_socket.open()
+    client_sock = client_socket.writer.get_extra_info("socket")
+    assert client_sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_LINGER, 8) == struct.pack("ii", 1, 0)
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+def test_use_uvloop():
+    uvloop = pytest.importorskip("uvloop")
+    policy = asyncio.get_event_loop_policy()
+    try:
+        use_uvloop()
+        assert isinstance(asyncio.get_event_loop_policy(),
+                          uvloop.EventLoopPolicy)
+    finally:
+        asyncio.set_event_loop_policy(policy)
+
+
+def test_listen_bind_failed():
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+
+    with mock.patch("socket.socket.bind",
+                    side_effect=OSError(errno.EADDRINUSE, "in use")), \
+            pytest.raises(OSError):
+        server_socket.listen()
+    # the socket isn't leaked
+    assert server_socket.raw_sock is None
+
+
+def test_reuseport_unsupported():
+    """SO_REUSEPORT errors meaning "not supported" are ignored."""
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    setsockopt = socket.socket.setsockopt
+
+    def fake_setsockopt(sock, level, opt, *args):
+        if opt == socket.SO_REUSEPORT:
+            raise OSError(errno.ENOPROTOOPT, "Protocol not available")
+        return setsockopt(sock, level, opt, *args)
+
+    with mock.patch("socket.socket.setsockopt", fake_setsockopt):
+        server_socket.listen()
+    server_socket.close()
+
+
+@pytest.mark.asyncio
+async def test_read_timeout():
+    async def handler(conn):
+        await asyncio.sleep(1)
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 socket_timeout=100)
+    await client_socket.open()
+    with pytest.raises(asyncio.TimeoutError):
+        await client_socket.read(1024)
+    with pytest.raises(asyncio.TimeoutError):
+        await client_socket.readexactly(1)
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_socket_pool():
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, conns = await _serve(server_socket)
+    port = _port(server_socket)
+
+    async with TAsyncSocketPool("127.0.0.1", port, size=3) as pool:
+        assert len(conns) == 3
+        socks = [await pool.acquire() for _ in range(3)]
+        assert len(set(socks)) == 3
+
+        # every connection is checked out, the next caller waits for one
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        pool.release(socks[1])
+        assert await waiter is socks[1]
+
+        for sock in socks:
+            sock.write(b"ping")
+            await sock.flush()
+            assert await sock.read(1024) == b"ping"
+            pool.release(sock)
+
+        # closing the pool wakes up callers still waiting
+        socks = [await pool.acquire() for _ in range(3)]
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0.01)
+    assert not pool.is_open()
+    assert not any(sock.is_open() for sock in socks)
+    with pytest.raises(TTransportException):
+        await waiter
+
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_socket_pool_open_failed():
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server_socket.listen()
+    port = _port(server_socket)
+    server_socket.close()
+
+    pool = TAsyncSocketPool("127.0.0.1", port, size=2)
+    with pytest.raises(TTransportException):
+        await pool.acquire()
+    assert not pool.is_open()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_raw_recv", [True, False])
+async def test_socket_pool_reopen(use_raw_recv):
+
+    async def handler(conn):
+        conn.write(await conn.read(1024))
+        await conn.flush()
+        conn.close()
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    async def ping(sock):
+        sock.write(b"ping")
+        await sock.flush()
+        assert await sock.read(1024) == b"ping"
+
+    async with TAsyncSocketPool("127.0.0.1", port, size=1,
+                                use_raw_recv=use_raw_recv) as pool:
+        sock = await pool.acquire()
+        await ping(sock)
+        with pytest.raises(TTransportException):
+            await sock.read(1024)
+        pool.release(sock)
+
+        # the connection closed by the peer is replaced
+        new_sock = await pool.acquire()
+        assert new_sock is not sock
+        await ping(new_sock)
+
+        # and so is one closed locally
+        new_sock.close()
+        pool.release(new_sock)
+        new_sock = await pool.acquire()
+        assert new_sock.is_open()
+        await ping(new_sock)
+        pool.release(new_sock)
+
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_unix_socket", [True, False])
+async def test_socket_pool_concurrent_acquire(use_unix_socket):
+    size = 256 * 1024
+
+    async def handler(conn):
+        # echo requests back until the client goes away
+        try:
+            while True:
+                conn.write(await conn.readexactly(size))
+                await conn.flush()
+        except TTransportException:
+            pass
+
+    if use_unix_socket:
+        sock_file = "/tmp/aio_thriftpy_test_pool.sock"
+        server_socket = TAsyncServerSocket(unix_socket=sock_file)
+        kwargs = {"unix_socket": sock_file}
+    else:
+        server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    if not use_unix_socket:
+        kwargs = {"host": "127.0.0.1", "port": _port(server_socket)}
+
+    async def call(pool, i):
+        sock = await pool.acquire()
+        try:
+            sock.write(bytes([i]) * size)
+            await sock.flush()
+            return await sock.readexactly(size)
+        finally:
+            pool.release(sock)
+
+    # more concurrent requests than connections, each gets its own reply
+    for pool_size in (1, 2):
+        async with TAsyncSocketPool(size=pool_size, **kwargs) as pool:
+            replies = await asyncio.wait_for(asyncio.gather(
+                *(call(pool, i) for i in range(6))), 5)
+        assert replies == [bytes([i]) * size for i in range(6)]
+
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_raw_recv", [True, False])
+async def test_read_into(use_raw_recv):
+    async def handler(conn):
+        buf = bytearray(12)
+        await conn.read_into(memoryview(buf))
+        conn.write(bytes(buf) * 2)
+        await conn.flush()
+        conn.close()
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 use_raw_recv=use_raw_recv)
+    await client_socket.open()
+    assert client_socket.use_raw_recv is use_raw_recv
+
+    client_socket.write(b"Hello World!")
+    await client_socket.flush()
+
+    buf = bytearray(6)
+    assert await client_socket.read_into(memoryview(buf)) == 6
+    assert buf == b"Hello "
+    assert await client_socket.readexactly(6) == b"World!"
+    assert await client_socket.readexactly(12) == b"Hello World!"
+    with pytest.raises(TTransportException):
+        await client_socket.read_into(memoryview(buf))
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_raw_readexactly_large():
+    size = 1024 * 1024
+    payload = os.urandom(size)
+
+    async def handler(conn):
+        conn.write(payload)
+        await conn.flush()
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 use_raw_recv=True)
+    await client_socket.open()
+
+    loop = asyncio.get_event_loop()
+    with mock.patch.object(loop, "sock_recv", wraps=loop.sock_recv) as recv:
+        data = await client_socket.readexactly(size)
+    assert type(data) is bytes and data == payload
+    # recvs never ask for more than what already arrived
+    sizes = [c[0][1] for c in recv.call_args_list]
+    assert sizes[0] == aio_socket._MAX_FIRST_RECV
+    assert all(sz <= aio_socket._MAX_FIRST_RECV * 2 ** i
+               for i, sz in enumerate(sizes))
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_raw_recv", [True, False])
+async def test_framed_read_into(use_raw_recv):
+    payload = b"Hello World!" * 10000
+
+    async def handler(conn):
+        for msg in (payload, b"", b"ping"):
+            conn.write(struct.pack("!i", len(msg)) + msg)
+        await conn.flush()
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 use_raw_recv=use_raw_recv)
+    await client_socket.open()
+
+    with mock.patch.object(client_socket, "read_into",
+                           wraps=client_socket.read_into) as read_into:
+        trans = TAsyncFramedTransport(client_socket)
+        assert await trans.read(len(payload) - 2) == payload[:-2]
+        assert await trans.read(10) == payload[-2:]
+        # the empty frame reads as nothing, then the next frame follows
+        assert await trans.read(10) == b""
+        assert await trans.read(10) == b"ping"
+    # only the raw path receives in place, streams would copy once more
+    assert read_into.called is use_raw_recv
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+_HUGE_FRAME = struct.pack("!i", 1536 * 1024 * 1024) + b"x" * 1000
+
+
+async def _read_frame_peak(trans):
+    """Read a frame from `trans`, which ends before the size claimed by its
+    header, and return the peak memory traced meanwhile."""
+    tracemalloc.start()
+    try:
+        with pytest.raises(TTransportException):
+            await trans.read(1)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_raw_recv", [True, False])
+async def test_framed_huge_header(use_raw_recv):
+    async def handler(conn):
+        conn.write(_HUGE_FRAME)
+        await conn.flush()
+        conn.close()
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 use_raw_recv=use_raw_recv)
+    await client_socket.open()
+    trans = TAsyncFramedTransport(client_socket)
+    # memory follows the data received, not the size in the header
+    assert await _read_frame_peak(trans) < 8 * 1024 * 1024
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_framed_huge_header_server():
+    peak = asyncio.get_event_loop().create_future()
+
+    async def handler(conn):
+        peak.set_result(await _read_frame_peak(TAsyncFramedTransport(conn)))
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port)
+    await client_socket.open()
+    client_socket.write(_HUGE_FRAME)
+    await client_socket.flush()
+    client_socket.close()
+    assert await peak < 8 * 1024 * 1024
+
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_raw_recv", [True, False])
+async def test_framed_negative_size(use_raw_recv):
+    async def handler(conn):
+        conn.write(struct.pack("!i", -1))
+        await conn.flush()
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 use_raw_recv=use_raw_recv)
+    await client_socket.open()
+    with pytest.raises(TTransportException):
+        await TAsyncFramedTransport(client_socket).read(1)
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+def test_raw_recv_ssl():
+    client_socket = TAsyncSocket(host="localhost", port=1234,
+                                 cafile="ssl/CA.pem",
+                                 certfile="ssl/client.crt",
+                                 keyfile="ssl/client.key",
+                                 use_raw_recv=True)
+    assert not client_socket.use_raw_recv
+
+
+@pytest.mark.asyncio
+async def test_set_timeout():
+    async def handler(conn):
+        await asyncio.sleep(1)
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port)
+    await client_socket.open()
+    client_socket.set_timeout(100)
+    assert client_socket.socket_timeout == client_socket.connect_timeout \
+        == 0.1
+    # the socket is driven by the event loop and must stay non-blocking
+    assert client_socket.raw_sock.gettimeout() == 0
+    with pytest.raises(asyncio.TimeoutError):
+        await client_socket.read(1024)
+
+    client_socket.set_timeout(0)
+    assert client_socket.socket_timeout is None
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket():
+    sock_file = "/tmp/aio_thriftpy_test_socket.sock"
+    server_socket = TAsyncServerSocket(unix_socket=sock_file)
+    server, _ = await _serve(server_socket)
+
+    client_socket = TAsyncSocket(unix_socket=sock_file)
+    # unix sockets bypass asyncio streams by default
+    assert client_socket.use_raw_recv
+    await client_socket.open()
+
+    client_socket.write(b"Hello World!")
+    await client_socket.flush()
+    assert await client_socket.readexactly(12) == b"Hello World!"
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_close_sends_pending():
+    sock_file = "/tmp/aio_thriftpy_test_close.sock"
+    received = asyncio.get_event_loop().create_future()
+
+    async def handler(conn):
+        received.set_result(await conn.readexactly(5))
+
+    server_socket = TAsyncServerSocket(unix_socket=sock_file)
+    server, _ = await _serve(server_socket, handler)
+
+    client_socket = TAsyncSocket(unix_socket=sock_file)
+    await client_socket.open()
+    client_socket.write(b"hello")
+    client_socket.close()
+    await client_socket.wait_closed()
+    assert await received == b"hello"
+
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_raw_recv", [False, True])
+async def test_close_while_reading(use_raw_recv):
+    async def handler(conn):
+        with pytest.raises(TTransportException):
+            await conn.read(1024)
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 socket_timeout=None,
+                                 use_raw_recv=use_raw_recv)
+    await client_socket.open()
+    fd = client_socket.raw_sock.fileno()
+
+    for read in (client_socket.read(1024), client_socket.readexactly(4)):
+        task = asyncio.ensure_future(read)
+        await asyncio.sleep(0.05)
+        client_socket.close()
+        # the pending read ends as EOF instead of hanging
+        with pytest.raises(TTransportException) as e:
+            await asyncio.wait_for(task, 1)
+        assert e.value.type == TTransportException.END_OF_FILE
+        await client_socket.wait_closed()
+        if use_raw_recv:
+            # and the closed fd is no longer watched by the loop
+            assert not asyncio.get_event_loop().remove_reader(fd)
+        await client_socket.open()
+        fd = client_socket.raw_sock.fileno()
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_raw_recv", [False, True])
+async def test_concurrent_flush(use_raw_recv):
+    size = 8 * 1024 * 1024
+    payloads = [b"a" * size, b"b" * size]
+    received = asyncio.get_event_loop().create_future()
+
+    async def handler(conn):
+        received.set_result(await conn.readexactly(2 * size))
+
+    server_socket = TAsyncServerSocket(host="127.0.0.1", port=0)
+    server, _ = await _serve(server_socket, handler)
+    port = _port(server_socket)
+
+    client_socket = TAsyncSocket(host="127.0.0.1", port=port,
+                                 use_raw_recv=use_raw_recv)
+    await client_socket.open()
+
+    async def send(payload):
+        client_socket.write(payload)
+        await client_socket.flush()
+
+    await asyncio.wait_for(asyncio.gather(*map(send, payloads)), 5)
+    assert await asyncio.wait_for(received, 5) == b"".join(payloads)
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_stale_file():
+    sock_file = "/tmp/aio_thriftpy_test_stale.sock"
+    if os.path.exists(sock_file):
+        os.unlink(sock_file)
+
+    # leave a socket file behind with nobody listening on it
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(sock_file)
+    stale.close()
+
+    server_socket = TAsyncServerSocket(unix_socket=sock_file)
+    server, _ = await _serve(server_socket)
+
+    client_socket = TAsyncSocket(unix_socket=sock_file)
+    await client_socket.open()
+    client_socket.write(b"ping")
+    await client_socket.flush()
+    assert await client_socket.read(1024) == b"ping"
+
+    client_socket.close()
+    server.close()
+    await server.wait_closed()
+
+
+def test_missing_certfile():
+    with pytest.raises(IOError):
+        TAsyncServerSocket(host="localhost", port=1234,
+                           certfile="ssl/missing.pem")
+
+
+def test_ssl_context_built_once():
+    """Cert files and cipher strings are only parsed for the first socket
+    created with a given set of ssl arguments."""
+    aio_socket._get_client_context.cache_clear()
+    aio_socket._get_server_context.cache_clear()
+    with mock.patch.object(aio_socket, "create_thriftpy_context",
+                           wraps=aio_socket.create_thriftpy_context) as create:
+        for port in range(1234, 1238):
+            TAsyncSocket(host="localhost", port=port, cafile="ssl/CA.pem",
+                         certfile="ssl/client.crt", keyfile="ssl/client.key")
+            TAsyncServerSocket(host="localhost", port=port,
+                               certfile="ssl/server.pem",
+                               keyfile="ssl/server.key")
+    assert create.call_count == 2
@@ -2,6 +2,7 @@
 
 from __future__ import absolute_import, division
 
+import errno
 import os
 import socket
 import sys
@@ -102,6 +103,20 @@ class TestTServerSocket:
         mock_sock.close.assert_called_once()
         assert server_socket.sock is None
 
+    def test_listen__reuseport_unsupported(self):
+        """SO_REUSEPORT errors meaning "not supported" are ignored."""
+        server_socket = TServerSocket(host="127.0.0.1", port=0)
+        setsockopt = socket.socket.setsockopt
+
+        def fake_setsockopt(sock, level, opt, *args):
+            if opt == getattr(socket, "SO_REUSEPORT", None):
+                raise OSError(errno.ENOPROTOOPT, "Protocol not available")
+            return setsockopt(sock, level, opt, *args)
+
+        with mock.patch("socket.socket.setsockopt", fake_setsockopt):
+            server_socket.listen()
+        server_socket.close()
+
 
 def test_inet6_socket():
     server_socket = TServerSocket(host="::1", port=12345,
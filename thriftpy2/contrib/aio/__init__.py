@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+
+def use_uvloop():
+    """Install uvloop's event loop policy.
+
+    uvloop implements the asyncio event loop on top of libuv and runs the
+    socket transports used by the aio client and server much faster than
+    the default selector loop. Call it once at startup, before any event
+    loop is created. Requires the optional `uvloop` package.
+    """
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
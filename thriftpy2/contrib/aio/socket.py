@@ -5,8 +5,10 @@ from __future__ import absolute_import, division
 import ssl
 import asyncio
 import errno
+import functools
 import os
 import socket
+import stat
 import struct
 import sys
 
@@ -20,15 +22,307 @@ from thriftpy2.transport._ssl import (
 MAC_OR_BSD = sys.platform == 'darwin' or sys.platform.startswith('freebsd')
 
 
+# upper bound of the first recv in raw readexactly(), later ones are bounded
+# by the data received so far
+_MAX_FIRST_RECV = 64 * 1024
+
+# l_onoff=1, l_linger=0: close() drops unsent data and resets the connection
+_LINGER_ABORT = struct.pack('ii', 1, 0)
+
+
+if sys.version_info >= (3, 11):
+    async def _wait_for(aw, timeout):
+        # asyncio.timeout() cancels the current task on expiry instead of
+        # wrapping `aw` in a new Task like wait_for() does.
+        async with asyncio.timeout(timeout):
+            return await aw
+else:
+    _wait_for = asyncio.wait_for
+
+
+# Shared by TAsyncSocket and StreamHandler. MAC_OR_BSD is bound as a default
+# argument so the hot path reads a local instead of a global.
+async def _aio_read(reader, sz, timeout, on_reset_close,
+                    _mac_or_bsd=MAC_OR_BSD):
+    try:
+        if timeout is None:
+            buff = await reader.read(sz)
+        else:
+            buff = await _wait_for(reader.read(sz), timeout)
+    except socket.error as e:
+        if e.errno == errno.ECONNRESET and _mac_or_bsd:
+            # freebsd and Mach don't follow POSIX semantic of recv
+            # and fail with ECONNRESET if peer performed shutdown.
+            # See corresponding comment and code in TSocket::read()
+            # in lib/cpp/src/transport/TSocket.cpp.
+            on_reset_close()
+            # Trigger the check to raise the END_OF_FILE exception below.
+            buff = b''
+        else:
+            raise
+
+    if len(buff) == 0:
+        raise TTransportException(type=TTransportException.END_OF_FILE,
+                                  message='TSocket read 0 bytes')
+    return buff
+
+
+async def _aio_readexactly(reader, sz, timeout, on_reset_close,
+                           _mac_or_bsd=MAC_OR_BSD):
+    try:
+        if timeout is None:
+            return await reader.readexactly(sz)
+        return await _wait_for(reader.readexactly(sz), timeout)
+    except asyncio.IncompleteReadError as e:
+        raise TTransportException(
+            type=TTransportException.END_OF_FILE,
+            message='TSocket read %d of %d bytes' % (len(e.partial), sz))
+    except socket.error as e:
+        if e.errno == errno.ECONNRESET and _mac_or_bsd:
+            on_reset_close()
+            raise TTransportException(
+                type=TTransportException.END_OF_FILE,
+                message='TSocket read 0 bytes')
+        raise
+
+
+async def _aio_read_into(reader, mv, timeout, on_reset_close,
+                         _mac_or_bsd=MAC_OR_BSD):
+    readinto = getattr(reader, 'readinto', None)
+    if readinto is None:
+        # StreamReader has no readinto, copy out of its buffer instead.
+        mv[:] = await _aio_readexactly(reader, len(mv), timeout,
+                                       on_reset_close)
+        return len(mv)
+
+    try:
+        if timeout is None:
+            return await readinto(mv)
+        return await _wait_for(readinto(mv), timeout)
+    except asyncio.IncompleteReadError as e:
+        raise TTransportException(
+            type=TTransportException.END_OF_FILE,
+            message='TSocket read %d of %d bytes' % (len(e.partial), len(mv)))
+    except socket.error as e:
+        if e.errno == errno.ECONNRESET and _mac_or_bsd:
+            on_reset_close()
+            raise TTransportException(
+                type=TTransportException.END_OF_FILE,
+                message='TSocket read 0 bytes')
+        raise
+
+
+def _set_nodelay(sock, nodelay):
+    # TCP_NODELAY only makes sense for TCP sockets, skip AF_UNIX ones.
+    if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(nodelay))
+
+
+def _set_buffer_sizes(sock, send_buffer_size, recv_buffer_size):
+    if send_buffer_size:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer_size)
+    if recv_buffer_size:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer_size)
+
+
+@functools.lru_cache(maxsize=128)
+def _get_client_context(certfile, keyfile, cafile, capath, ciphers, validate):
+    # contexts are shared by every socket created with the same arguments,
+    # so PEM files are only parsed once per process.
+    context = create_thriftpy_context(server_side=False, ciphers=ciphers)
+
+    if cafile or capath:
+        context.load_verify_locations(cafile=cafile, capath=capath)
+
+    if certfile:
+        context.load_cert_chain(certfile, keyfile=keyfile)
+
+    if not validate:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+    return context
+
+
+@functools.lru_cache(maxsize=128)
+def _get_server_context(certfile, keyfile, ciphers):
+    context = create_thriftpy_context(server_side=True, ciphers=ciphers)
+    context.load_cert_chain(certfile, keyfile=keyfile)
+    # session tickets are on by default, as the context is cached its ticket
+    # keys and session cache live as long as the process.
+    return context
+
+
+class _RawSocketReader(object):
+    """Minimal StreamReader replacement reading straight from a non-blocking
+    socket with the event loop's sock_recv* methods."""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._fd = sock.fileno()
+        self._loop = asyncio.get_event_loop()
+        self._eof = False
+        self._closed = False
+        self._waiter = None
+
+    def at_eof(self):
+        return self._eof
+
+    async def _wait(self, recv, eof):
+        # the pending sock_recv* never wakes up once the fd is closed, run it
+        # as a task close() can cancel.
+        self._waiter = waiter = asyncio.ensure_future(recv)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if self._closed:
+                return eof
+            raise
+        finally:
+            self._waiter = None
+
+    async def _recv(self, n):
+        if self._closed:
+            return b''
+        try:
+            # skip the task when the data is already there
+            return self._sock.recv(n)
+        except (BlockingIOError, InterruptedError):
+            pass
+        return await self._wait(self._loop.sock_recv(self._sock, n), b'')
+
+    async def _recv_into(self, mv):
+        if self._closed:
+            return 0
+        try:
+            return self._sock.recv_into(mv)
+        except (BlockingIOError, InterruptedError):
+            pass
+        return await self._wait(self._loop.sock_recv_into(self._sock, mv), 0)
+
+    async def read(self, n):
+        data = await self._recv(n)
+        if not data and n:
+            self._eof = True
+        return data
+
+    async def readexactly(self, n):
+        # `n` may come from a frame header, so never ask for more than what
+        # already arrived: memory only grows with the data actually received.
+        data = await self._recv(min(n, _MAX_FIRST_RECV))
+        if len(data) == n:
+            return data
+
+        chunks, have = [data], len(data)
+        while data and have < n:
+            data = await self._recv(min(n - have, have))
+            chunks.append(data)
+            have += len(data)
+        if have < n:
+            self._eof = True
+            raise asyncio.IncompleteReadError(b''.join(chunks), n)
+        return b''.join(chunks)
+
+    async def readinto(self, mv):
+        have, sz = 0, len(mv)
+        while have < sz:
+            n = await self._recv_into(mv[have:])
+            if n == 0:
+                self._eof = True
+                raise asyncio.IncompleteReadError(bytes(mv[:have]), sz)
+            have += n
+        return sz
+
+    def close(self):
+        """Stop reading, a pending read returns EOF. Must be called before
+        the socket is closed so the fd is unregistered from the loop."""
+        if self._closed:
+            return
+        self._closed = True
+        self._loop.remove_reader(self._fd)
+        if self._waiter is not None:
+            self._waiter.cancel()
+
+
+class _RawSocketWriter(object):
+    """Minimal StreamWriter replacement sending with sock_sendall.
+
+    Writes are only sent on drain(), which the sockets call on flush(), and
+    on close().
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._loop = asyncio.get_event_loop()
+        self._chunks = []
+        # sock_sendall() doesn't support concurrent calls on one socket, the
+        # second call replaces the first one's writer callback and it never
+        # completes. Serialise drain() so concurrent flushes queue up.
+        self._lock = asyncio.Lock()
+        self._closing = None
+
+    def get_extra_info(self, name, default=None):
+        return self._sock if name == 'socket' else default
+
+    def write(self, data):
+        self._chunks.append(data)
+
+    def writelines(self, chunks):
+        self._chunks.extend(chunks)
+
+    async def drain(self):
+        async with self._lock:
+            while self._chunks:
+                chunks, self._chunks = self._chunks, []
+                for chunk in chunks:
+                    await self._loop.sock_sendall(self._sock, chunk)
+
+    def close(self):
+        if self._closing is not None:
+            return
+
+        if self._chunks or self._lock.locked():
+            # like StreamWriter.close(), send what was written so far before
+            # closing the socket.
+            self._closing = self._loop.create_task(self._drain_and_close())
+        else:
+            self._closing = self._loop.create_future()
+            self._closing.set_result(None)
+            self._close_sock()
+
+    async def _drain_and_close(self):
+        try:
+            await self.drain()
+        except (socket.error, OSError):
+            pass
+        finally:
+            self._close_sock()
+
+    def _close_sock(self):
+        # unregister the fd before closing it, the number may be reused.
+        self._loop.remove_writer(self._sock.fileno())
+        self._sock.close()
+
+    async def wait_closed(self):
+        if self._closing is not None:
+            await self._closing
+
+
 class TAsyncSocket(object):
-    """Socket implementation for client side."""
+    """Socket implementation for client side.
+
+    For better performance, call `thriftpy2.contrib.aio.use_uvloop()` at
+    startup to run on uvloop if it's installed.
+    """
 
     def __init__(self, host=None, port=None, unix_socket=None,
                  sock=None, socket_family=socket.AF_INET,
                  socket_timeout=3000, connect_timeout=None,
                  ssl_context=None, validate=True,
                  cafile=None, capath=None, certfile=None, keyfile=None,
-                 ciphers=DEFAULT_CIPHERS):
+                 ciphers=DEFAULT_CIPHERS, nodelay=True,
+                 send_buffer_size=None, recv_buffer_size=None,
+                 abortive_close=False, use_raw_recv=None):
         """Initialize a TSocket
 
         TSocket can be initialized in 3 ways:
@@ -63,6 +357,31 @@ class TAsyncSocket(object):
         @param ssl_context(SSLContext)  Customize the SSLContext, can be used
             to persist SSLContext object. Caution it's easy to get wrong, only
             use if you know what you're doing.
+
+            SSLContexts built from certfile/keyfile are cached and shared by
+            all sockets created with the same ssl arguments, so cert files
+            changed on disk won't be reloaded, pass a fresh ssl_context to
+            pick them up.
+        @param nodelay(bool)        Set TCP_NODELAY to disable Nagle's
+            algorithm on TCP connections. Default enabled.
+        @param send_buffer_size(int)    SO_SNDBUF size in bytes for TCP
+            connections. Default None keeps the system default. Setting it
+            disables the kernel's send buffer autotuning for the socket, and
+            values above net.core.wmem_max are silently clamped.
+        @param recv_buffer_size(int)    SO_RCVBUF size in bytes for TCP
+            connections. Default None keeps the system default. Setting it
+            disables the kernel's receive buffer autotuning (which can grow
+            up to the net.ipv4.tcp_rmem maximum) for the socket, and values
+            above net.core.rmem_max are silently clamped.
+        @param abortive_close(bool) Set SO_LINGER with a zero timeout so
+            close() resets the connection instead of shutting it down
+            gracefully. Unsent data is dropped and TLS close_notify is never
+            sent, default disabled.
+        @param use_raw_recv(bool)   Bypass asyncio streams and read/write the
+            socket directly with the event loop's sock_recv_into and
+            sock_sendall, saving a buffer copy per read. Writes are only sent
+            on flush() or close(). Ignored for SSL connections. Defaults to
+            enabled for unix sockets and disabled for TCP.
         """
         if sock:
             self.raw_sock = sock
@@ -83,39 +402,44 @@ class TAsyncSocket(object):
         self.socket_timeout = socket_timeout / 1000 if socket_timeout else None
         self.connect_timeout = connect_timeout / 1000 if connect_timeout \
             else self.socket_timeout
+        self.nodelay = nodelay
+        self.send_buffer_size = send_buffer_size
+        self.recv_buffer_size = recv_buffer_size
+        self.abortive_close = abortive_close
 
         if ssl_context:
             self.ssl_context = ssl_context
             self.server_hostname = host
         elif certfile or keyfile:
             self.server_hostname = host
-            self.ssl_context = create_thriftpy_context(server_side=False,
-                                                       ciphers=ciphers)
-
-            if cafile or capath:
-                self.ssl_context.load_verify_locations(cafile=cafile,
-                                                       capath=capath)
-
-            if certfile:
-                self.ssl_context.load_cert_chain(certfile, keyfile=keyfile)
-
-            if not validate:
-                self.ssl_context.check_hostname = False
-                self.ssl_context.verify_mode = ssl.CERT_NONE
+            self.ssl_context = _get_client_context(
+                certfile, keyfile, cafile, capath, ciphers, validate)
         else:
             self.ssl_context = None
             self.server_hostname = None
 
+        # the raw path can't do TLS, keep using streams for SSL sockets.
+        if use_raw_recv is None:
+            # unix sockets have no Nagle or TLS to deal with, talking to
+            # them directly skips the StreamReader buffering entirely.
+            use_raw_recv = bool(unix_socket)
+        self.use_raw_recv = use_raw_recv and self.ssl_context is None
+
     def _init_sock(self):
         if self.unix_socket:
             _sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         else:
             _sock = socket.socket(self.socket_family, socket.SOCK_STREAM)
-            _sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            _set_nodelay(_sock, self.nodelay)
+            # buffer sizes must be set before connect/listen to take effect
+            # on the TCP window scale negotiated at handshake.
+            _set_buffer_sizes(_sock, self.send_buffer_size,
+                              self.recv_buffer_size)
 
         # socket options
-        linger = struct.pack('ii', 0, 0)
-        _sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, linger)
+        if self.abortive_close:
+            _sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER,
+                             _LINGER_ABORT)
         _sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
 
         self.raw_sock = _sock
@@ -126,12 +450,13 @@ class TAsyncSocket(object):
     def set_timeout(self, ms):
         """Backward compat api, will bind the timeout to both connect_timeout
         and socket_timeout.
-        """
-        self.socket_timeout = ms / 1000 if (ms and ms > 0) else None
-        self.connect_timeout = self.socket_timeout
 
-        if self.raw_sock is not None:
-            self.raw_sock.settimeout(self.socket_timeout)
+        Once opened the socket belongs to the event loop and must stay
+        non-blocking, so the new timeout only applies to later reads and
+        flushes (and the next open).
+        """
+        self.socket_timeout = self.connect_timeout = \
+            ms / 1000 if (ms and ms > 0) else None
 
     def is_open(self):
         return bool(self.raw_sock)
@@ -142,6 +467,16 @@ class TAsyncSocket(object):
         addr = self.unix_socket or (self.host, self.port)
 
         try:
+            if self.use_raw_recv:
+                self.raw_sock.setblocking(False)
+                await _wait_for(
+                    asyncio.get_event_loop().sock_connect(self.raw_sock, addr),
+                    self.connect_timeout
+                )
+                self.reader = _RawSocketReader(self.raw_sock)
+                self.writer = _RawSocketWriter(self.raw_sock)
+                return
+
             if self.connect_timeout:
                 self.raw_sock.settimeout(self.connect_timeout)
 
@@ -158,60 +493,205 @@ class TAsyncSocket(object):
                 self.sock_factory(**kwargs),
                 self.socket_timeout
             )
+            # the stream transport may override the option set before
+            # connecting, so apply it again on the connected socket.
+            _set_nodelay(self.writer.get_extra_info('socket'), self.nodelay)
 
-        except (socket.error, OSError):
+        except (socket.error, OSError, asyncio.TimeoutError):
+            self.raw_sock.close()
+            self.raw_sock = None
             raise TTransportException(
                 type=TTransportException.NOT_OPEN,
                 message="Could not connect to %s" % str(addr))
 
     async def read(self, sz):
-        try:
-            buff = await asyncio.wait_for(
-                self.reader.read(sz),
-                self.connect_timeout
-            )
-        except socket.error as e:
-            if e.errno == errno.ECONNRESET and MAC_OR_BSD:
-                # freebsd and Mach don't follow POSIX semantic of recv
-                # and fail with ECONNRESET if peer performed shutdown.
-                # See corresponding comment and code in TSocket::read()
-                # in lib/cpp/src/transport/TSocket.cpp.
-                self.close()
-                # Trigger the check to raise the END_OF_FILE exception below.
-                buff = ''
-            else:
-                raise
+        return await _aio_read(self.reader, sz, self.connect_timeout,
+                               self.close)
+
+    async def readexactly(self, sz):
+        return await _aio_readexactly(self.reader, sz, self.connect_timeout,
+                                      self.close)
 
-        if len(buff) == 0:
-            raise TTransportException(type=TTransportException.END_OF_FILE,
-                                      message='TSocket read 0 bytes')
-        return buff
+    async def read_into(self, mv):
+        """Fill the writable buffer `mv` (e.g. a memoryview over a
+        preallocated bytearray) and return the number of bytes read."""
+        return await _aio_read_into(self.reader, mv, self.connect_timeout,
+                                    self.close)
 
     def write(self, buff):
         self.writer.write(buff)
 
+    def write_vectored(self, chunks):
+        self.writer.writelines(chunks)
+
     async def flush(self):
-        await asyncio.wait_for(self.writer.drain(), self.connect_timeout)
+        await _wait_for(self.writer.drain(), self.connect_timeout)
 
     def close(self):
         if not self.raw_sock:
             return
 
         try:
+            if self.use_raw_recv:
+                # wake up a pending read before the writer closes the fd
+                self.reader.close()
+            # the stream transport owns raw_sock and closes it once the
+            # pending data is written, don't close it a second time here.
             self.writer.close()
-            self.raw_sock.close()
             self.raw_sock = None
         except (socket.error, OSError):
             pass
 
+    async def wait_closed(self):
+        """Wait until the stream closed by close() is fully shut down,
+        including the TLS close_notify exchange."""
+        if hasattr(self.writer, 'wait_closed'):
+            await self.writer.wait_closed()
+
+
+def _is_alive(conn):
+    # a connection reset or closed by the peer has its reader at EOF
+    return conn.is_open() and not conn.reader.at_eof()
+
+
+class TAsyncSocketPool(object):
+    """A fixed size pool of TAsyncSocket connections to the same server.
+
+    All connections are opened together and share one cached SSLContext.
+    acquire() checks out an idle connection for exclusive use, waiting for
+    one to be released if all are busy, and release() gives it back. A
+    connection found closed or at EOF is reopened when it's acquired.
+    """
+
+    def __init__(self, host=None, port=None, size=4, **kwargs):
+        """Initialize a TAsyncSocketPool
+
+        @param host(str)    The host to connect to.
+        @param port(int)    The (TCP) port to connect to.
+        @param size(int)    Number of connections in the pool.
+        @param kwargs       Other arguments are passed to every TAsyncSocket.
+        """
+        if size < 1:
+            raise ValueError("size must be a positive integer.")
+
+        self.host = host
+        self.port = port
+        self.size = size
+        self.socket_kwargs = kwargs
+
+        self._conns = []
+        self._idle = None
+        self._pool_creation_lock = None
+
+    def is_open(self):
+        return bool(self._conns)
+
+    async def open(self):
+        if self._conns:
+            return
+
+        # created lazily so the lock binds to the running event loop
+        if self._pool_creation_lock is None:
+            self._pool_creation_lock = asyncio.Lock()
+
+        async with self._pool_creation_lock:
+            if self._conns:
+                return
+
+            conns = [TAsyncSocket(self.host, self.port, **self.socket_kwargs)
+                     for _ in range(self.size)]
+            results = await asyncio.gather(
+                *(conn.open() for conn in conns), return_exceptions=True)
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                for conn in conns:
+                    conn.close()
+                raise errors[0]
+
+            idle = asyncio.Queue()
+            for conn in conns:
+                idle.put_nowait(conn)
+            # only publish the pool once every connection is open
+            self._conns, self._idle = conns, idle
+
+    async def acquire(self):
+        """Check out an idle connection, it must be given back with
+        release() once the caller is done with it."""
+        if not self._conns:
+            await self.open()
+
+        idle = self._idle
+        conn = None if idle is None else await idle.get()
+        if conn is None:
+            if idle is not None:
+                # closed while waiting, wake up the next waiter as well
+                idle.put_nowait(None)
+            raise TTransportException(type=TTransportException.NOT_OPEN,
+                                      message="Pool is closed")
+
+        if not _is_alive(conn):
+            try:
+                conn = await self._reopen(conn)
+            except BaseException:
+                # keep the slot, the next acquire() retries it
+                self.release(conn)
+                raise
+        return conn
+
+    async def _reopen(self, conn):
+        conn.close()
+        new_conn = TAsyncSocket(self.host, self.port, **self.socket_kwargs)
+        await new_conn.open()
+
+        if conn not in self._conns:
+            # the pool was closed meanwhile
+            new_conn.close()
+            raise TTransportException(type=TTransportException.NOT_OPEN,
+                                      message="Pool is closed")
+        self._conns[self._conns.index(conn)] = new_conn
+        return new_conn
+
+    def release(self, conn):
+        """Give back a connection checked out with acquire()."""
+        if conn in self._conns:
+            self._idle.put_nowait(conn)
+        else:
+            # the pool was closed since it was acquired
+            conn.close()
+
+    def close(self):
+        conns, self._conns = self._conns, []
+        idle, self._idle = self._idle, None
+        for conn in conns:
+            conn.close()
+        if idle is not None:
+            # wake up callers waiting in acquire()
+            idle.put_nowait(None)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 
 class TAsyncServerSocket(object):
-    """Socket implementation for server side."""
+    """Socket implementation for server side.
+
+    For better performance, call `thriftpy2.contrib.aio.use_uvloop()` at
+    startup to run on uvloop if it's installed.
+
+    The listening socket sets SO_REUSEPORT where supported. To use several
+    cores, run one server process (each with its own event loop) per core on
+    the same host/port and the kernel spreads new connections over them.
+    """
 
     def __init__(self, host=None, port=None, unix_socket=None,
                  socket_family=socket.AF_INET, client_timeout=3000,
                  backlog=128, ssl_context=None, certfile=None, keyfile=None,
-                 ciphers=RESTRICTED_SERVER_CIPHERS):
+                 ciphers=RESTRICTED_SERVER_CIPHERS, nodelay=True,
+                 send_buffer_size=None, recv_buffer_size=None):
         """Initialize a TServerSocket
 
         TSocket can be initialized in 2 ways:
@@ -231,6 +711,21 @@ class TAsyncServerSocket(object):
         @param ssl_context(SSLContext)  Customize the SSLContext, can be used
             to persist SSLContext object. Caution it's easy to get wrong, only
             use if you know what you're doing.
+
+            SSLContexts built from certfile/keyfile are cached per
+            certfile/keyfile/ciphers, like the client side.
+        @param nodelay(bool)        Set TCP_NODELAY to disable Nagle's
+            algorithm on accepted TCP connections. Default enabled.
+        @param send_buffer_size(int)    SO_SNDBUF size in bytes for accepted
+            TCP connections. Default None keeps the system default. Setting
+            it disables the kernel's send buffer autotuning for the
+            connections, and values above net.core.wmem_max are silently
+            clamped.
+        @param recv_buffer_size(int)    SO_RCVBUF size in bytes for accepted
+            TCP connections. Default None keeps the system default. Setting
+            it disables the kernel's receive buffer autotuning (which can
+            grow up to the net.ipv4.tcp_rmem maximum) for the connections,
+            and values above net.core.rmem_max are silently clamped.
         """
         if unix_socket:
             self.unix_socket = unix_socket
@@ -246,37 +741,44 @@ class TAsyncServerSocket(object):
         self.socket_family = socket_family
         self.client_timeout = client_timeout / 1000 if client_timeout else None
         self.backlog = backlog
+        self.nodelay = nodelay
+        self.send_buffer_size = send_buffer_size
+        self.recv_buffer_size = recv_buffer_size
+        self.raw_sock = None
 
         if ssl_context:
             self.ssl_context = ssl_context
         elif certfile:
-            if not os.access(certfile, os.R_OK):
-                raise IOError('No such certfile found: %s' % certfile)
-
-            self.ssl_context = create_thriftpy_context(server_side=True,
-                                                       ciphers=ciphers)
-            self.ssl_context.load_cert_chain(certfile, keyfile=keyfile)
+            # load_cert_chain raises FileNotFoundError for a missing certfile
+            self.ssl_context = _get_server_context(certfile, keyfile, ciphers)
         else:
             self.ssl_context = None
 
     def _init_sock(self):
         if self.unix_socket:
-            # try remove the sock file it already exists
-            _sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # remove the sock file if it already exists, without a blocking
+            # connect() to probe it. Other kinds of files are left alone so
+            # bind() fails instead of deleting them.
             try:
-                _sock.connect(self.unix_socket)
-            except (socket.error, OSError) as err:
-                if err.errno == errno.ECONNREFUSED:
+                if stat.S_ISSOCK(os.stat(self.unix_socket).st_mode):
                     os.unlink(self.unix_socket)
+            except FileNotFoundError:
+                pass
+            _sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         else:
             _sock = socket.socket(self.socket_family, socket.SOCK_STREAM)
+            _set_nodelay(_sock, self.nodelay)
+            # set before listen() so accepted sockets inherit them.
+            _set_buffer_sizes(_sock, self.send_buffer_size,
+                              self.recv_buffer_size)
 
         _sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         if hasattr(socket, "SO_REUSEPORT"):
             try:
                 _sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             except socket.error as err:
-                if err[0] in (errno.ENOPROTOOPT, errno.EINVAL):
+                if err.errno in (errno.ENOPROTOOPT, errno.EINVAL,
+                                 errno.EOPNOTSUPP):
                     pass
                 else:
                     raise
@@ -287,8 +789,13 @@ class TAsyncServerSocket(object):
         self._init_sock()
 
         addr = self.unix_socket or (self.host, self.port)
-        self.raw_sock.bind(addr)
-        self.raw_sock.listen(self.backlog)
+        try:
+            self.raw_sock.bind(addr)
+            self.raw_sock.listen(self.backlog)
+        except (socket.error, OSError):
+            self.raw_sock.close()
+            self.raw_sock = None
+            raise
 
     async def accept(self, callback):
         server = await self.sock_factory(
@@ -301,6 +808,9 @@ class TAsyncServerSocket(object):
     def _create_client_connected_cb(self, callback):
 
         async def client_connected_cb(reader, writer):
+            # accepted sockets don't reliably inherit the listening socket's
+            # TCP_NODELAY, so set it on every client connection.
+            _set_nodelay(writer.get_extra_info('socket'), self.nodelay)
             try:
                 await asyncio.wait_for(
                     callback(StreamHandler(reader, writer)),
@@ -327,28 +837,20 @@ class StreamHandler(object):
         self.reader, self.writer = reader, writer
 
     async def read(self, sz):
-        try:
-            buff = await self.reader.read(sz)
-        except socket.error as e:
-            if e.errno == errno.ECONNRESET and MAC_OR_BSD:
-                # freebsd and Mach don't follow POSIX semantic of recv
-                # and fail with ECONNRESET if peer performed shutdown.
-                # See corresponding comment and code in TSocket::read()
-                # in lib/cpp/src/transport/TSocket.cpp.
-                self.close()
-                # Trigger the check to raise the END_OF_FILE exception below.
-                buff = ''
-            else:
-                raise
+        return await _aio_read(self.reader, sz, None, self.close)
 
-        if len(buff) == 0:
-            raise TTransportException(type=TTransportException.END_OF_FILE,
-                                      message='TSocket read 0 bytes')
-        return buff
+    async def readexactly(self, sz):
+        return await _aio_readexactly(self.reader, sz, None, self.close)
+
+    async def read_into(self, mv):
+        return await _aio_read_into(self.reader, mv, None, self.close)
 
     def write(self, buff):
         self.writer.write(buff)
 
+    def write_vectored(self, chunks):
+        self.writer.writelines(chunks)
+
     async def flush(self):
         await self.writer.drain()
 
@@ -358,5 +860,9 @@ class StreamHandler(object):
         except (socket.error, OSError):
             pass
 
+    async def wait_closed(self):
+        if hasattr(self.writer, 'wait_closed'):
+            await self.writer.wait_closed()
+
     async def open(self):
         pass
@@ -3,18 +3,35 @@
 from __future__ import absolute_import
 
 import struct
+from functools import partial
 from io import BytesIO
 
+from thriftpy2.transport import TTransportException
+
 from .base import TAsyncTransportBase, readall
 from .buffered import TAsyncBufferedTransport
 
+# largest frame buffer allocated before any of the frame's data arrived
+_MAX_FRAME_PREALLOC = 64 * 1024
+
 
 class TAsyncFramedTransport(TAsyncTransportBase):
     """Class that wraps another transport and frames its I/O when writing."""
     def __init__(self, trans):
         self._trans = trans
-        self._rbuf = BytesIO()
+        # the current frame and the read position in it
+        self._rbuf = memoryview(b'')
+        self._rpos = 0
         self._wbuf = BytesIO()
+        # frame sizes are known upfront, so prefer the underlying transport's
+        # readexactly when available instead of looping over short reads.
+        self._readexactly = getattr(trans, 'readexactly', None) or \
+            partial(readall, trans.read)
+        # sockets reading without asyncio streams can receive the frame
+        # straight into its buffer, stream readers would copy it once more.
+        self._read_into = getattr(trans, 'read_into', None) \
+            if getattr(trans, 'use_raw_recv', False) else None
+        self._write_vectored = getattr(trans, 'write_vectored', None)
 
     def is_open(self):
         return self._trans.is_open()
@@ -31,18 +48,42 @@ class TAsyncFramedTransport(TAsyncTransportBase):
         if sz == 0:
             return b''
 
-        ret = self._rbuf.read(sz)
-        if len(ret) != 0:
-            return ret
+        if self._rpos >= len(self._rbuf):
+            await self.read_frame()
 
-        await self.read_frame()
-        return self._rbuf.read(sz)
+        start = self._rpos
+        ret = bytes(self._rbuf[start:start + sz])
+        self._rpos = start + len(ret)
+        return ret
 
     async def read_frame(self):
-        buff = await readall(self._trans.read, 4)
+        buff = await self._readexactly(4)
         sz, = struct.unpack('!i', buff)
-        frame = await readall(self._trans.read, sz)
-        self._rbuf = BytesIO(frame)
+        if sz < 0:
+            raise TTransportException(TTransportException.UNKNOWN,
+                                      "Invalid frame size %d" % sz)
+
+        if self._read_into is not None:
+            frame = await self._read_frame_into(sz)
+        else:
+            frame = await self._readexactly(sz)
+        self._rbuf, self._rpos = memoryview(frame), 0
+
+    async def _read_frame_into(self, sz):
+        # the size comes from the peer, so only preallocate a bounded buffer
+        # and grow it as the data arrives.
+        frame = bytearray(min(sz, _MAX_FRAME_PREALLOC))
+        have = 0
+        while True:
+            await self._read_into(memoryview(frame)[have:])
+            have = len(frame)
+            if have == sz:
+                return frame
+            # a fresh buffer instead of resizing, the old one may still be
+            # exported to a memoryview.
+            grown = bytearray(min(sz, have * 2))
+            grown[:have] = frame
+            frame = grown
 
     def write(self, buf):
         self._wbuf.write(buf)
@@ -52,12 +93,18 @@ class TAsyncFramedTransport(TAsyncTransportBase):
         out = self._wbuf.getvalue()
         self._wbuf = BytesIO()
 
-        # N.B.: Doing this string concatenation is WAY cheaper than making
-        # two separate calls to the underlying socket object. Socket writes in
-        # Python turn out to be REALLY expensive, but it seems to do a pretty
-        # good job of managing string buffer operations without excessive
-        # copies
-        self._trans.write(struct.pack("!i", len(out)) + out)
+        header = struct.pack("!i", len(out))
+        if self._write_vectored is not None:
+            # hand header and payload over as separate chunks, the stream
+            # transport can send them together without joining them first.
+            self._write_vectored([header, out])
+        else:
+            # N.B.: Doing this string concatenation is WAY cheaper than making
+            # two separate calls to the underlying socket object. Socket
+            # writes in Python turn out to be REALLY expensive, but it seems
+            # to do a pretty good job of managing string buffer operations
+            # without excessive copies
+            self._trans.write(header + out)
         await self._trans.flush()
 
     def getvalue(self):
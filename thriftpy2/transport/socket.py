@@ -120,7 +120,7 @@ class TSocket(object):
                     # in lib/cpp/src/transport/TSocket.cpp.
                     self.close()
                     # Trigger the check to raise the END_OF_FILE exception.
-                    buff = ''
+                    buff = b''
                     break
                 else:
                     raise
@@ -205,7 +205,8 @@ class TServerSocket(object):
             try:
                 _sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             except socket.error as err:
-                if err[0] in (errno.ENOPROTOOPT, errno.EINVAL):
+                if err.errno in (errno.ENOPROTOOPT, errno.EINVAL,
+                                 errno.EOPNOTSUPP):
                     pass
                 else:
                     raise